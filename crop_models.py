@@ -0,0 +1,105 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+from torchvision.models import resnet50
+
+# Convolutional trunk shared by all crops when they were fine-tuned with a frozen backbone (see
+# `python export_models.py head`); each crop then only ships its resnet50_<crop>_fc.pt head
+shared_backbone_path = "backbone.pt"
+
+# Optional single-file pack of every crop's weights (see `python export_models.py pack`). Tensors are
+# keyed "<checkpoint file stem>/<state dict key>", e.g. "resnet50_grapes/fc.weight".
+packed_weights_path = "models.safetensors"
+
+# Largest number of uploads sent through the model in one forward pass (and the largest batch the
+# exported TensorRT engines are built for)
+max_batch_size = 8
+
+# The only batch sizes torch.compile'd models (and their CUDA graphs) ever see. They are specialized per
+# input shape, so the loader warms every one of these up front and batches are padded to the next one;
+# any other size would trigger a recompile during a user's request. Backends with dynamic batch
+# dimensions (TorchScript, ONNX Runtime, TensorRT) are given the real batch size instead.
+compiled_batch_sizes = (1, 2, 4, max_batch_size)
+
+
+def padded_batch_size(num_images):
+    return next(size for size in compiled_batch_sizes if size >= num_images)
+
+
+# Quantized CPU backend for the INT8 exports: "x86" (PyTorch >= 2.0) picks FBGEMM or oneDNN per op,
+# older builds only ship FBGEMM. Export and inference must use the same engine.
+def quantized_engine():
+    return "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+
+
+# Builds the classifier head that replaces ResNet-50's fc layer for the given fc_type
+def build_fc_head(num_ftrs, num_classes, fc_type):
+    if fc_type == "single_linear":
+        return nn.Linear(num_ftrs, num_classes)
+    elif fc_type == "custom_sequential_peanut":
+        return nn.Sequential(
+            nn.Linear(num_ftrs, 512),
+            nn.ReLU(),
+            nn.Dropout(0.3),
+            nn.Linear(512, num_classes)
+        )
+    elif fc_type == "custom_sequential_new_crop":
+        return nn.Sequential(
+            nn.Linear(num_ftrs, 256),
+            nn.ReLU(),
+            nn.Dropout(0.4),
+            nn.Linear(256, num_classes)
+        )
+    else:
+        raise ValueError(f"Unknown FC layer type: {fc_type}. Please check model_info configuration.")
+
+
+# Builds the ResNet-50 architecture a crop's checkpoint was trained with (shared by the app and export_models.py)
+def build_resnet50(num_classes, fc_type):
+    model = resnet50(weights=None)
+    model.fc = build_fc_head(model.fc.in_features, num_classes, fc_type)
+    return model
+
+
+# ResNet-50 without its classifier: maps a batch of images to 2048-d pooled features
+def build_backbone():
+    model = resnet50(weights=None)
+    model.fc = nn.Identity()
+    return model
+
+
+# Decodes an upload to at most 512px on the long side, which is plenty for both the on-screen preview
+# and the 224x224 model input.
+def open_leaf_image(image_source):
+    image = Image.open(image_source)
+    # Let libjpeg scale down while decoding (DCT scaling) instead of materializing the full-resolution
+    # photo; draft() is a no-op for PNGs, which thumbnail() box-reduces before its bilinear pass.
+    image.draft('RGB', (512, 512))
+    image = image.convert('RGB')
+    image.thumbnail((512, 512), Image.Resampling.BILINEAR)
+    return image
+
+
+# The only CPU-side pass over the model input: one bilinear resize, then an HWC uint8 array of the
+# pixels. np.asarray copies them out of Pillow (via tobytes()) into a read-only array, so callers must
+# not modify it in place. A batch of these stacks straight into NHWC, i.e. channels_last without a transpose.
+def model_input_pixels(image):
+    return np.asarray(image.resize((224, 224), Image.Resampling.BILINEAR))
+
+
+# ImageNet statistics the checkpoints were trained with
+imagenet_mean = (0.485, 0.456, 0.406)
+imagenet_std = (0.229, 0.224, 0.225)
+
+
+# Mean/std as (1, 3, 1, 1) tensors on `device`, pre-scaled to 0-255 so they apply to the uint8 pixels
+def normalization_tensors(device):
+    mean = torch.tensor(imagenet_mean, device=device).view(1, 3, 1, 1) * 255
+    std = torch.tensor(imagenet_std, device=device).view(1, 3, 1, 1) * 255
+    return mean, std
+
+
+# One fused pass from a uint8 NCHW batch to the normalized float input
+def normalize(batch, mean, std):
+    return (batch.float() - mean) / std
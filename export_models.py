@@ -0,0 +1,210 @@
+"""Offline export of the per-crop ResNet-50 checkpoints to faster inference formats.
+
+The app picks up an exported file automatically when it sits next to the original checkpoint, e.g.:
+
+    python export_models.py onnx resnet50_grapes.pt --num-classes 4 --fc-type single_linear
+    python export_models.py int8 resnet50_grapes.pt --num-classes 4 --fc-type single_linear --calibration-dir leaves/
+    python export_models.py tensorrt resnet50_grapes.pt --num-classes 4 --fc-type single_linear
+    python export_models.py torchscript resnet50_grapes.pt --num-classes 4 --fc-type single_linear
+    python export_models.py head resnet50_grapes.pt --num-classes 4 --fc-type single_linear
+    python export_models.py safetensors resnet50_grapes.pt --num-classes 4 --fc-type single_linear
+    python export_models.py pack
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import torch
+
+from crop_models import (build_resnet50, max_batch_size, model_input_pixels, normalization_tensors, normalize,
+                         open_leaf_image, packed_weights_path, quantized_engine, shared_backbone_path)
+
+
+def load_checkpoint(path, num_classes, fc_type):
+    model = build_resnet50(num_classes, fc_type)
+    model.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+    model.eval()
+    return model
+
+
+# 3x224x224 input; the batch dimension is dynamic because the app batches multi-image uploads
+def export_onnx(model, checkpoint_path):
+    onnx_path = os.path.splitext(checkpoint_path)[0] + ".onnx"
+    torch.onnx.export(
+        model,
+        torch.randn(1, 3, 224, 224),
+        onnx_path,
+        opset_version=17,
+        input_names=["x"],
+        output_names=["logits"],
+        dynamic_axes={"x": {0: "batch"}, "logits": {0: "batch"}},
+    )
+    return onnx_path
+
+
+# Up to `limit` images from anywhere under image_dir (datasets usually keep one subfolder per class),
+# spread evenly over the sorted paths so every class is represented. Calibrating on nothing would
+# silently produce an uncalibrated INT8 model, so an empty folder is an error.
+def calibration_image_paths(image_dir, limit=100):
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(image_dir)
+        for name in names
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    if not paths:
+        raise SystemExit(f"No .jpg/.jpeg/.png images found under {image_dir} for int8 calibration")
+    if len(paths) <= limit:
+        return paths
+    return [paths[i * len(paths) // limit] for i in range(limit)]
+
+
+# Calibration images go through exactly the app's preprocessing (decode to <=512px, one bilinear
+# resize, normalization), so the observers see the input distribution the quantized model will get
+def calibration_batches(image_paths):
+    mean, std = normalization_tensors("cpu")
+    for path in image_paths:
+        pixels = model_input_pixels(open_leaf_image(path))
+        yield normalize(torch.from_numpy(np.stack([pixels])).permute(0, 3, 1, 2), mean, std)
+
+
+# FX graph-mode post-training static quantization for the CPU path (int8 kernels, VNNI where available).
+# Saved as TorchScript because the converted GraphModule cannot be reloaded as a plain state dict.
+def export_int8(model, checkpoint_path, calibration_dir):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    image_paths = calibration_image_paths(calibration_dir)
+    engine = quantized_engine()
+    torch.backends.quantized.engine = engine
+    example_input = torch.randn(1, 3, 224, 224)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (example_input,))
+    with torch.no_grad():
+        for batch in calibration_batches(image_paths):
+            prepared(batch)
+    quantized = convert_fx(prepared)
+
+    int8_path = os.path.splitext(checkpoint_path)[0] + "_int8.pt"
+    torch.jit.save(torch.jit.trace(quantized, example_input), int8_path)
+    return int8_path
+
+
+# TensorRT engine built for the GPU it runs on (rebuild per GPU model), FP16, optimized for single images
+# but accepting batches up to max_batch_size
+def export_tensorrt(model, checkpoint_path):
+    import torch_tensorrt
+
+    trt_model = torch_tensorrt.compile(
+        model.cuda(),
+        ir="ts",
+        inputs=[torch_tensorrt.Input(
+            min_shape=(1, 3, 224, 224),
+            opt_shape=(1, 3, 224, 224),
+            max_shape=(max_batch_size, 3, 224, 224),
+        )],
+        enabled_precisions={torch.float16},
+    )
+    trt_path = os.path.splitext(checkpoint_path)[0] + "_trt.ts"
+    torch.jit.save(trt_model, trt_path)
+    return trt_path
+
+
+# Frozen TorchScript trace with FP16 weights for GPU hosts without TensorRT. Traced on the GPU in
+# channels-last layout, which is what the app feeds it; CPU conv kernels have no FP16 fast path.
+def export_torchscript_fp16(model, checkpoint_path):
+    model = model.cuda().half().to(memory_format=torch.channels_last)
+    example_input = torch.randn(1, 3, 224, 224, device="cuda", dtype=torch.float16).to(memory_format=torch.channels_last)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, example_input))
+    ts_path = os.path.splitext(checkpoint_path)[0] + "_fp16.ts"
+    torch.jit.save(traced, ts_path)
+    return ts_path
+
+
+# Splits a checkpoint into the shared backbone.pt and a per-crop <checkpoint>_fc.pt head. Only valid
+# for crops fine-tuned with the backbone frozen: the first export writes backbone.pt, and every later
+# one must have bit-identical convolutional weights, otherwise it is rejected.
+def export_head(model, checkpoint_path):
+    backbone_state = {k: v for k, v in model.state_dict().items() if not k.startswith("fc.")}
+    if os.path.exists(shared_backbone_path):
+        shared_state = torch.load(shared_backbone_path, map_location="cpu", weights_only=True)
+        if shared_state.keys() != backbone_state.keys() or any(
+                not torch.equal(shared_state[k], v) for k, v in backbone_state.items()):
+            raise SystemExit(f"{checkpoint_path} does not share the backbone in {shared_backbone_path}; "
+                             "keep using the full checkpoint for this crop")
+    else:
+        torch.save(backbone_state, shared_backbone_path)
+
+    head_path = os.path.splitext(checkpoint_path)[0] + "_fc.pt"
+    torch.save(model.fc.state_dict(), head_path)
+    return head_path
+
+
+# Same weights as the checkpoint in safetensors format, which the app mmaps instead of unpickling.
+# Also converts backbone.pt when run after the head export.
+def export_safetensors(model, checkpoint_path):
+    from safetensors.torch import save_file
+
+    safetensors_path = os.path.splitext(checkpoint_path)[0] + ".safetensors"
+    save_file({k: v.contiguous() for k, v in model.state_dict().items()}, safetensors_path)
+    if os.path.exists(shared_backbone_path):
+        shared_state = torch.load(shared_backbone_path, map_location="cpu", weights_only=True)
+        save_file(shared_state, os.path.splitext(shared_backbone_path)[0] + ".safetensors")
+    return safetensors_path
+
+
+# Packs every checkpoint listed in model_index.json (and backbone.pt, if present) into one safetensors
+# file, so a cold start opens and maps a single file however many crops are browsed
+def export_pack():
+    from safetensors.torch import save_file
+
+    with open("model_index.json", encoding="utf-8") as f:
+        model_index = json.load(f)
+    checkpoint_paths = [info["model_path"] for info in model_index.values()]
+    if os.path.exists(shared_backbone_path):
+        checkpoint_paths.append(shared_backbone_path)
+
+    packed = {}
+    for checkpoint_path in checkpoint_paths:
+        prefix = os.path.splitext(os.path.basename(checkpoint_path))[0]
+        state_dict = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+        packed.update({f"{prefix}/{k}": v.contiguous() for k, v in state_dict.items()})
+    save_file(packed, packed_weights_path)
+    return packed_weights_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("format", choices=["onnx", "int8", "tensorrt", "torchscript", "head", "safetensors", "pack"])
+    parser.add_argument("checkpoint", nargs="?", help="Path to the crop's resnet50_<crop>.pt state dict (not used by pack)")
+    parser.add_argument("--num-classes", type=int)
+    parser.add_argument("--fc-type")
+    parser.add_argument("--calibration-dir", help="Folder of sample leaf images (searched recursively), required for int8")
+    args = parser.parse_args()
+    if args.format == "pack":
+        print(f"Wrote {export_pack()}")
+        return
+    if args.checkpoint is None or args.num_classes is None or args.fc_type is None:
+        parser.error(f"{args.format} export needs a checkpoint, --num-classes and --fc-type")
+    if args.format == "int8" and not args.calibration_dir:
+        parser.error("int8 export needs --calibration-dir")
+
+    model = load_checkpoint(args.checkpoint, args.num_classes, args.fc_type)
+    if args.format == "onnx":
+        out_path = export_onnx(model, args.checkpoint)
+    elif args.format == "int8":
+        out_path = export_int8(model, args.checkpoint, args.calibration_dir)
+    elif args.format == "tensorrt":
+        out_path = export_tensorrt(model, args.checkpoint)
+    elif args.format == "torchscript":
+        out_path = export_torchscript_fp16(model, args.checkpoint)
+    elif args.format == "head":
+        out_path = export_head(model, args.checkpoint)
+    elif args.format == "safetensors":
+        out_path = export_safetensors(model, args.checkpoint)
+    print(f"Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Plain-text rendering of Gemini's markdown replies for text-to-speech."""
+import re
+
+# Patterns used by clean_markdown, compiled once rather than looked up in re's cache on every call.
+# Links are replaced by their text in a first pass: an underscore before a link (as in Early_blight)
+# would otherwise open an _italic_ match that runs into the URL and leave it to be read aloud.
+# Every other construct is one alternative of a single pattern so the rest is scanned once:
+# bullets (tried first, so a leading "* " is not taken for an italic marker), **bold**, *italic*,
+# __bold__, _italic_ and h1-h3 markers. The named group is the text that is kept.
+link_re = re.compile(r'\[(.*?)\]\(.*?\)')
+markdown_re = re.compile(
+    r'^\s*[-*]\s+'
+    r'|\*\*(?P<bold>[^*]+)\*\*'
+    r'|\*(?P<italic>[^*]+)\*'
+    r'|__(?P<bold_underscore>[^_]+)__'
+    r'|_(?P<italic_underscore>[^_]+)_'
+    r'|#{1,3} ',
+    re.MULTILINE,
+)
+whitespace_re = re.compile(r'\s+')
+strip_asterisks = str.maketrans('', '', '*')
+
+
+# Replaces one markdown_re match with the text it wraps (nothing for bullets and headings). The
+# wrapped text is cleaned too, e.g. italic inside bold.
+def unwrap_markdown(match):
+    kept = match.group(match.lastgroup) if match.lastgroup else ''
+    return markdown_re.sub(unwrap_markdown, kept)
+
+
+# Turns a markdown reply into plain text for the speech engine
+def clean_markdown(text):
+    # Remove link targets, then bold/italic markers, bullet points and heading markers in one pass
+    # (this also turns bolded keywords such as **Cause:** into plain "Cause:")
+    text = link_re.sub(r'\1', text)
+    text = markdown_re.sub(unwrap_markdown, text)
+
+    # Remove any remaining asterisks that might be part of scientific names (e.g., *Guignardia bidwellii*)
+    # This is a bit more aggressive. If you want to keep "Guignardia bidwellii" as a single spoken phrase,
+    # you might need a more sophisticated parser or to educate the TTS engine.
+    # For simplicity, this will remove them.
+    text = text.translate(strip_asterisks)
+
+    # Clean up extra spaces that might result from removals
+    text = whitespace_re.sub(' ', text).strip()
+    return text
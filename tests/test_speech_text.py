@@ -0,0 +1,27 @@
+from speech_text import clean_markdown
+
+
+def test_bold_keyword_keeps_its_text():
+    assert clean_markdown('**Cause:** x') == 'Cause: x'
+
+
+def test_link_after_underscored_label_drops_the_url():
+    text = "Early_blight: see [guide](https://x.org/early_blight)."
+    assert clean_markdown(text) == "Early_blight: see guide."
+
+
+def test_bullets_emphasis_and_headings():
+    text = (
+        "- **Cause:** Fungus *Alternaria solani*.\n"
+        "- **Treatment:** Spray __copper__ and _mancozeb_.\n"
+        "* Remove leaves\n"
+        "## Prevention\n"
+        "- Rotate crops"
+    )
+    assert clean_markdown(text) == (
+        "Cause: Fungus Alternaria solani. Treatment: Spray copper and mancozeb. Remove leaves Prevention Rotate crops"
+    )
+
+
+def test_link_inside_bold():
+    assert clean_markdown("**[guide](https://a.b/c)** and __[x](y)__") == "guide and x"